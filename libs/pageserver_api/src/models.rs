@@ -358,10 +358,16 @@ pub struct TimelineInfo {
     /// Sum of the size of all layer files.
     /// If a layer is present in both local FS and S3, it counts only once.
     pub current_physical_size: Option<u64>, // is None when timeline is Unloaded
+    /// Sum of the size of the layer files present in the local FS.
+    pub current_resident_physical_size: Option<u64>,
     pub current_logical_size_non_incremental: Option<u64>,
 
     pub timeline_dir_layer_file_size_sum: Option<u64>,
 
+    /// Number of layer files successfully downloaded from remote storage.
+    /// Is None when remote storage is not configured.
+    pub layer_download_count: Option<u64>,
+
     pub wal_source_connstr: Option<String>,
     #[serde_as(as = "Option<DisplayFromStr>")]
     pub last_received_msg_lsn: Option<Lsn>,
@@ -3,6 +3,7 @@
 //!
 use std::collections::HashMap;
 use std::sync::Arc;
+use std::time::Duration;
 
 use anyhow::{anyhow, Context, Result};
 use hyper::StatusCode;
@@ -266,6 +267,11 @@ async fn build_timeline_info_common(
         }
     };
     let current_physical_size = Some(timeline.layer_size_sum().await);
+    let current_resident_physical_size = Some(timeline.get_resident_physical_size());
+    let layer_download_count = timeline
+        .remote_client
+        .as_ref()
+        .map(|remote_client| remote_client.get_layer_download_count());
     let state = timeline.current_state();
     let remote_consistent_lsn = timeline.get_remote_consistent_lsn().unwrap_or(Lsn(0));
 
@@ -281,8 +287,10 @@ async fn build_timeline_info_common(
         latest_gc_cutoff_lsn: *timeline.get_latest_gc_cutoff_lsn(),
         current_logical_size,
         current_physical_size,
+        current_resident_physical_size,
         current_logical_size_non_incremental: None,
         timeline_dir_layer_file_size_sum: None,
+        layer_download_count,
         wal_source_connstr,
         last_received_msg_lsn,
         last_received_msg_ts,
@@ -451,6 +459,36 @@ async fn get_lsn_by_timestamp_handler(
     json_response(StatusCode::OK, result)
 }
 
+async fn timeline_wait_lsn_handler(
+    request: Request<Body>,
+    _cancel: CancellationToken,
+) -> Result<Response<Body>, ApiError> {
+    let tenant_id: TenantId = parse_request_param(&request, "tenant_id")?;
+    let timeline_id: TimelineId = parse_request_param(&request, "timeline_id")?;
+    check_permission(&request, Some(tenant_id))?;
+
+    let lsn: Lsn = parse_query_param(&request, "lsn")?
+        .ok_or_else(|| ApiError::BadRequest(anyhow!("no lsn specified in query parameters")))?;
+
+    // Don't let a single request hold the handler for longer than wait_lsn_timeout
+    let max_timeout = get_state(&request).conf.wait_lsn_timeout;
+    let timeout: Duration = parse_query_param::<_, humantime::Duration>(&request, "timeout")?
+        .map_or(max_timeout, |timeout| {
+            Duration::from(timeout).min(max_timeout)
+        });
+
+    let timeline = active_timeline_of_active_tenant(tenant_id, timeline_id).await?;
+    // Failing to wait, e.g. running into the timeout, is not a request error:
+    // the caller compares the returned last_record_lsn with the LSN it asked for.
+    match tokio::time::timeout(timeout, timeline.wait_last_record_lsn(lsn)).await {
+        Ok(Ok(())) => {}
+        Ok(Err(e)) => info!("waiting for lsn {lsn} finished early: {e}"),
+        Err(_) => info!("waiting for lsn {lsn} timed out after {timeout:?}"),
+    }
+
+    json_response(StatusCode::OK, timeline.get_last_record_lsn().to_string())
+}
+
 async fn tenant_attach_handler(
     mut request: Request<Body>,
     _cancel: CancellationToken,
@@ -1381,6 +1419,10 @@ pub fn make_router(
             "/v1/tenant/:tenant_id/timeline/:timeline_id/get_lsn_by_timestamp",
             |r| api_handler(r, get_lsn_by_timestamp_handler),
         )
+        .get(
+            "/v1/tenant/:tenant_id/timeline/:timeline_id/wait_lsn",
+            |r| api_handler(r, timeline_wait_lsn_handler),
+        )
         .put("/v1/tenant/:tenant_id/timeline/:timeline_id/do_gc", |r| {
             api_handler(r, timeline_gc_handler)
         })
@@ -1100,6 +1100,21 @@ impl RemoteTimelineClientMetrics {
         metric.clone()
     }
 
+    /// Number of finished remote operations of the given kind and status, read from
+    /// the `remote_operation_time` histogram. `None` if no such operation has been
+    /// recorded yet; unlike [`Self::remote_operation_time`], this doesn't create the
+    /// metric.
+    pub fn get_remote_operation_count(
+        &self,
+        file_kind: &RemoteOpFileKind,
+        op_kind: &RemoteOpKind,
+        status: &'static str,
+    ) -> Option<u64> {
+        let guard = self.remote_operation_time.lock().unwrap();
+        let key = (file_kind.as_str(), op_kind.as_str(), status);
+        guard.get(&key).map(|histo| histo.get_sample_count())
+    }
+
     fn calls_unfinished_gauge(
         &self,
         file_kind: &RemoteOpFileKind,
@@ -422,6 +422,19 @@ impl RemoteTimelineClient {
         self.metrics.remote_physical_size_gauge().get()
     }
 
+    /// Number of layer files successfully downloaded, as reported by the
+    /// `pageserver_remote_operation_seconds` metric. A timeline that hasn't
+    /// downloaded any layers has no such metric yet, which counts as 0.
+    pub fn get_layer_download_count(&self) -> u64 {
+        self.metrics
+            .get_remote_operation_count(
+                &RemoteOpFileKind::Layer,
+                &RemoteOpKind::Download,
+                "success",
+            )
+            .unwrap_or(0)
+    }
+
     //
     // Download operations.
     //
@@ -67,7 +67,7 @@ use utils::{
     completion,
     id::{TenantId, TimelineId},
     lsn::{AtomicLsn, Lsn, RecordLsn},
-    seqwait::SeqWait,
+    seqwait::{SeqWait, SeqWaitError},
     simple_rcu::{Rcu, RcuReadGuard},
 };
 
@@ -660,6 +660,15 @@ impl Timeline {
         }
     }
 
+    /// Wait until WAL has been received up to this LSN, with no timeout of its own.
+    ///
+    /// Unlike [`Self::wait_lsn`], this doesn't count towards `wait_lsn_time_histo`,
+    /// which is meant for page service requests. For management API callers that
+    /// bound the wait themselves.
+    pub async fn wait_last_record_lsn(&self, lsn: Lsn) -> Result<(), SeqWaitError> {
+        self.last_record_lsn.wait_for(lsn).await
+    }
+
     /// Check that it is valid to request operations with that lsn.
     pub fn check_lsn_is_in_scope(
         &self,
@@ -1,5 +1,5 @@
 from collections import defaultdict
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 from prometheus_client.parser import text_string_to_metric_families
 from prometheus_client.samples import Sample
@@ -7,10 +7,12 @@ from prometheus_client.samples import Sample
 
 class Metrics:
     metrics: Dict[str, List[Sample]]
+    samples_by_labels: Dict[Tuple[str, FrozenSet[Tuple[str, str]]], Sample]
     name: str
 
     def __init__(self, name: str = ""):
         self.metrics = defaultdict(list)
+        self.samples_by_labels = {}
         self.name = name
 
     def query_all(self, name: str, filter: Optional[Dict[str, str]] = None) -> List[Sample]:
@@ -29,6 +31,13 @@ class Metrics:
         assert len(res) == 1, f"expected single sample for {name} {filter}, found {res}"
         return res[0]
 
+    def query_exact(self, name: str, labels: Dict[str, str]) -> Optional[Sample]:
+        """
+        Find the sample with exactly the given set of labels, without scanning
+        all the samples of the metric like `query_all` does.
+        """
+        return self.samples_by_labels.get((name, frozenset(labels.items())))
+
 
 def parse_metrics(text: str, name: str = "") -> Metrics:
     metrics = Metrics(name)
@@ -36,6 +45,7 @@ def parse_metrics(text: str, name: str = "") -> Metrics:
     for family in gen:
         for sample in family.samples:
             metrics.metrics[sample.name].append(sample)
+            metrics.samples_by_labels[(sample.name, frozenset(sample.labels.items()))] = sample
 
     return metrics
 
@@ -413,6 +413,31 @@ class PageserverHttpClient(requests.Session):
         res_json = res.json()
         return res_json
 
+    def timeline_wait_lsn(
+        self,
+        tenant_id: TenantId,
+        timeline_id: TimelineId,
+        lsn: Lsn,
+        timeout: Optional[float] = None,
+    ) -> Lsn:
+        """
+        Waits on the pageserver side until last_record_lsn reaches `lsn`, or `timeout`
+        seconds pass. The timeout defaults to, and is capped at, the pageserver's
+        wait_lsn_timeout.
+        Returns the last_record_lsn.
+        """
+        params = {"lsn": str(lsn)}
+        if timeout is not None:
+            params["timeout"] = f"{int(timeout * 1000)}ms"
+        res = self.get(
+            f"http://localhost:{self.port}/v1/tenant/{tenant_id}/timeline/{timeline_id}/wait_lsn",
+            params=params,
+        )
+        self.verbose_error(res)
+        res_json = res.json()
+        assert isinstance(res_json, str)
+        return Lsn(res_json)
+
     def timeline_checkpoint(self, tenant_id: TenantId, timeline_id: TimelineId):
         self.is_testing_enabled_or_skip()
 
@@ -543,6 +568,11 @@ class PageserverHttpClient(requests.Session):
         self, name: str, filter: Optional[Dict[str, str]] = None
     ) -> Optional[float]:
         metrics = self.get_metrics()
+        # Most callers pass the full label set of the sample they want, which is a
+        # direct lookup. Otherwise scan the samples of the metric for matches.
+        exact = metrics.query_exact(name, filter or {})
+        if exact is not None:
+            return exact.value
         results = metrics.query_all(name, filter=filter)
         if not results:
             log.info(f'could not find metric "{name}"')
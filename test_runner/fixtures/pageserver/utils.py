@@ -159,6 +159,21 @@ def wait_for_last_record_lsn(
     lsn: Lsn,
 ) -> Lsn:
     """waits for pageserver to catch up to a certain lsn, returns the last observed lsn."""
+    try:
+        # Same 10 second budget as the polling below
+        current_lsn = pageserver_http.timeline_wait_lsn(tenant, timeline, lsn, timeout=10)
+        if current_lsn >= lsn:
+            return current_lsn
+        raise Exception(
+            "timed out while waiting for last_record_lsn to reach {}, was {}".format(
+                lsn, current_lsn
+            )
+        )
+    except PageserverApiException as e:
+        # Older pageservers (e.g. in compatibility tests) don't have the wait_lsn endpoint
+        if e.status_code != 404:
+            raise
+    # Fall back to polling the timeline details
     for i in range(10):
         current_lsn = last_record_lsn(pageserver_http, tenant, timeline)
         if current_lsn >= lsn:
@@ -286,15 +286,31 @@ def wait_until(number_of_iterations: int, interval: float, func: Fn):
     """
     Wait until 'func' returns successfully, without exception. Returns the
     last return value from the function.
+
+    Gives up after at least number_of_iterations calls, and once it has slept
+    number_of_iterations * interval seconds in total between them, like a plain
+    loop sleeping 'interval' after each call would. The time spent in 'func' itself
+    doesn't count against that budget. The first retries are done quickly, backing
+    off exponentially up to 'interval', so that conditions that become true soon
+    are noticed without a full 'interval' of delay.
     """
+    sleep_budget = number_of_iterations * interval
+    slept = 0.0
+    backoff = min(0.02, interval)
     last_exception = None
-    for i in range(number_of_iterations):
+    i = 0
+    while True:
+        i += 1
         try:
             res = func()
         except Exception as e:
-            log.info("waiting for %s iteration %s failed", func, i + 1)
+            log.info("waiting for %s iteration %s failed", func, i)
             last_exception = e
-            time.sleep(interval)
+            if i >= number_of_iterations and slept >= sleep_budget:
+                break
+            time.sleep(backoff)
+            slept += backoff
+            backoff = min(backoff * 2, interval)
             continue
         return res
     raise Exception("timed out while waiting for %s" % func) from last_exception
@@ -1,13 +1,16 @@
 # It's possible to run any regular test with the local fs remote storage via
 # env ZENITH_PAGESERVER_OVERRIDES="remote_storage={local_path='/tmp/neon_zzz/'}" poetry ......
 
+import concurrent.futures
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from io import BytesIO
 from pathlib import Path
-from typing import Any, DefaultDict, Dict, Tuple
+from typing import Any, DefaultDict, Deque, Dict, Tuple
 
 import pytest
 from fixtures.log_helper import log
+from fixtures.metrics import Metrics
 from fixtures.neon_fixtures import (
     NeonEnvBuilder,
     RemoteStorageKind,
@@ -27,20 +30,37 @@ from fixtures.types import Lsn
 from fixtures.utils import query_scalar, wait_until
 
 
-def get_num_downloaded_layers(client: PageserverHttpClient, tenant_id, timeline_id):
-    value = client.get_metric_value(
-        "pageserver_remote_operation_seconds_count",
-        {
-            "file_kind": "layer",
-            "op_kind": "download",
-            "status": "success",
-            "tenant_id": tenant_id,
-            "timeline_id": timeline_id,
-        },
-    )
-    if value is None:
+def large_rel_copy_data(ids: range) -> BytesIO:
+    """
+    COPY input for the large relation: rows (i, 'long string to consume some space<i>')
+    for each i in ids. Built up front with a single join, about 45 MB for 1M rows.
+    """
+    return BytesIO("".join(f"{i}\tlong string to consume some space{i}\n" for i in ids).encode())
+
+
+def layer_downloads_metric_labels(tenant_id, timeline_id) -> Dict[str, str]:
+    """Labels of the pageserver_remote_operation_seconds_count sample counting layer downloads."""
+    return {
+        "file_kind": "layer",
+        "op_kind": "download",
+        "status": "success",
+        "tenant_id": str(tenant_id),
+        "timeline_id": str(timeline_id),
+    }
+
+
+def get_num_downloaded_layers(metrics: Metrics, labels: Dict[str, str]) -> int:
+    sample = metrics.query_exact("pageserver_remote_operation_seconds_count", labels)
+    if sample is None:
         return 0
-    return int(value)
+    return int(sample.value)
+
+
+def unlink_all_layers(repo_dir: Path):
+    """Unlink every layer file of every timeline in the pageserver's tenants directory."""
+    for layer in (repo_dir / "tenants").glob("*/timelines/*/*-*_*"):
+        log.info("unlinking layer %s", layer)
+        layer.unlink()
 
 
 #
@@ -79,17 +99,40 @@ def test_ondemand_download_large_rel(
 
     tenant_id = endpoint.safe_psql("show neon.tenant_id")[0][0]
     timeline_id = endpoint.safe_psql("show neon.timeline_id")[0][0]
+    downloads_labels = layer_downloads_metric_labels(tenant_id, timeline_id)
 
     # We want to make sure that the data is large enough that the keyspace is partitioned.
     num_rows = 1000000
 
+    # Load the data over several connections in parallel, one COPY stream each.
+    # The ids are striped across the streams rather than split into contiguous
+    # ranges. That way a row's position in the table still roughly follows its
+    # id, like with a single stream, and the id probed below stays in the middle.
+    n_copy_streams = 4
+
+    def copy_stream(stream: int):
+        with endpoint.cursor() as cur:
+            # data loading may take a while, so increase statement timeout
+            cur.execute("SET statement_timeout='300s'")
+            ids = range(1 + stream, num_rows + 1, n_copy_streams)
+            cur.copy_expert("COPY tbl FROM STDIN", large_rel_copy_data(ids))
+
     with endpoint.cursor() as cur:
-        # data loading may take a while, so increase statement timeout
+        # building the index may take a while too
         cur.execute("SET statement_timeout='300s'")
-        cur.execute(
-            f"""CREATE TABLE tbl AS SELECT g as id, 'long string to consume some space' || g
-        from generate_series(1,{num_rows}) g"""
-        )
+        cur.execute("CREATE TABLE tbl (id int, s text)")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=n_copy_streams) as executor:
+            futures = [executor.submit(copy_stream, stream) for stream in range(n_copy_streams)]
+            for future in futures:
+                future.result()
+
+        # Build the index with parallel workers, and enough memory to sort in memory.
+        # parallel_workers is a table option, so set it on the table; otherwise the
+        # planner picks the number of workers from the table size.
+        cur.execute("SET maintenance_work_mem='1GB'")
+        cur.execute("SET max_parallel_maintenance_workers=4")
+        cur.execute("ALTER TABLE tbl SET (parallel_workers=4)")
         cur.execute("CREATE INDEX ON tbl (id)")
         cur.execute("VACUUM tbl")
 
@@ -117,9 +160,7 @@ def test_ondemand_download_large_rel(
     env.pageserver.stop()
 
     # remove all the layer files
-    for layer in (Path(env.repo_dir) / "tenants").glob("*/timelines/*/*-*_*"):
-        log.info(f"unlinking layer {layer}")
-        layer.unlink()
+    unlink_all_layers(env.repo_dir)
 
     ##### Second start, restore the data and ensure it's the same
     env.pageserver.start()
@@ -129,7 +170,7 @@ def test_ondemand_download_large_rel(
     # safekeepers, that have now been shut down.
     endpoint = env.endpoints.create_start("main", lsn=current_lsn)
 
-    before_downloads = get_num_downloaded_layers(client, tenant_id, timeline_id)
+    before_downloads = get_num_downloaded_layers(client.get_metrics(), downloads_labels)
     assert before_downloads != 0, "basebackup should on-demand non-zero layers"
 
     # Probe in the middle of the table. There's a high chance that the beginning
@@ -140,7 +181,7 @@ def test_ondemand_download_large_rel(
     with endpoint.cursor() as cur:
         assert query_scalar(cur, "select count(*) from tbl where id = 500000") == 1
 
-    after_downloads = get_num_downloaded_layers(client, tenant_id, timeline_id)
+    after_downloads = get_num_downloaded_layers(client.get_metrics(), downloads_labels)
     log.info(f"layers downloaded before {before_downloads} and after {after_downloads}")
     assert after_downloads > before_downloads
 
@@ -190,6 +231,8 @@ def test_ondemand_download_timetravel(
     lsns = []
 
     table_len = 10000
+    # Build the whole history over a single connection, instead of reconnecting
+    # for every checkpoint.
     with endpoint.cursor() as cur:
         cur.execute(
             f"""
@@ -198,23 +241,25 @@ def test_ondemand_download_timetravel(
         """
         )
         current_lsn = Lsn(query_scalar(cur, "SELECT pg_current_wal_flush_lsn()"))
-    # wait until pageserver receives that data
-    wait_for_last_record_lsn(client, tenant_id, timeline_id, current_lsn)
-    # run checkpoint manually to be sure that data landed in remote storage
-    client.timeline_checkpoint(tenant_id, timeline_id)
-    lsns.append((0, current_lsn))
+        # wait until pageserver receives that data
+        wait_for_last_record_lsn(client, tenant_id, timeline_id, current_lsn)
+        # run checkpoint manually to be sure that data landed in remote storage
+        client.timeline_checkpoint(tenant_id, timeline_id)
+        lsns.append((0, current_lsn))
 
-    for checkpoint_number in range(1, 20):
-        with endpoint.cursor() as cur:
+        for checkpoint_number in range(1, 20):
+            # Don't send the UPDATE and the flush LSN query as one multi-statement
+            # string: they would run in one implicit transaction, and the LSN would
+            # be read before the UPDATE is committed.
             cur.execute(f"UPDATE testtab SET checkpoint_number = {checkpoint_number}")
             current_lsn = Lsn(query_scalar(cur, "SELECT pg_current_wal_flush_lsn()"))
-        lsns.append((checkpoint_number, current_lsn))
+            lsns.append((checkpoint_number, current_lsn))
 
-        # wait until pageserver receives that data
-        wait_for_last_record_lsn(client, tenant_id, timeline_id, current_lsn)
+            # wait until pageserver receives that data
+            wait_for_last_record_lsn(client, tenant_id, timeline_id, current_lsn)
 
-        # run checkpoint manually to be sure that data landed in remote storage
-        client.timeline_checkpoint(tenant_id, timeline_id)
+            # run checkpoint manually to be sure that data landed in remote storage
+            client.timeline_checkpoint(tenant_id, timeline_id)
 
     ##### Stop the first pageserver instance, erase all its data
     env.endpoints.stop_all()
@@ -232,9 +277,9 @@ def test_ondemand_download_timetravel(
         )
 
     filled_current_physical = get_api_current_physical_size()
-    log.info(filled_current_physical)
+    log.info("filled_current_physical=%s", filled_current_physical)
     filled_size = get_resident_physical_size()
-    log.info(filled_size)
+    log.info("filled_size=%s", filled_size)
     assert filled_current_physical == filled_size, "we don't yet do layer eviction"
 
     # Wait until generated image layers are uploaded to S3
@@ -244,9 +289,7 @@ def test_ondemand_download_timetravel(
     env.pageserver.stop()
 
     # remove all the layer files
-    for layer in (Path(env.repo_dir) / "tenants").glob("*/timelines/*/*-*_*"):
-        log.info(f"unlinking layer {layer}")
-        layer.unlink()
+    unlink_all_layers(env.repo_dir)
 
     ##### Second start, restore the data and ensure it's the same
     env.pageserver.start()
@@ -259,33 +302,48 @@ def test_ondemand_download_timetravel(
     # current_physical_size because they are loaded as `RemoteLayer`s.
     assert filled_current_physical == get_api_current_physical_size()
 
-    # Run queries at different points in time
-    num_layers_downloaded = [0]
-    resident_size = [get_resident_physical_size()]
+    # The checks below only look three points-in-time back, so keep just the last four values
+    num_layers_downloaded: Deque[int] = deque(maxlen=4)
+    resident_size: Deque[float] = deque(maxlen=4)
+    # Run queries at different points in time, one after another: the checks below
+    # rely on each query downloading the layers it needs on top of what the earlier
+    # ones already downloaded.
     for checkpoint_number, lsn in lsns:
-        endpoint_old = env.endpoints.create_start(
+        # Postgres can only read at the LSN it was started at, so every point in
+        # time needs its own read-only endpoint. Stop it as soon as the queries are
+        # done instead of keeping all of them running until the end of the test.
+        with env.endpoints.create_start(
             branch_name="main", endpoint_id=f"ep-old_lsn_{checkpoint_number}", lsn=lsn
-        )
-        with endpoint_old.cursor() as cur:
-            # assert query_scalar(cur, f"select count(*) from testtab where checkpoint_number={checkpoint_number}") == 100000
-            assert (
-                query_scalar(
-                    cur,
-                    f"select count(*) from testtab where checkpoint_number<>{checkpoint_number}",
+        ) as endpoint_old:
+            with endpoint_old.cursor() as cur:
+                # count the rows of this and of all the other checkpoints in a single scan
+                cur.execute(
+                    f"""
+                SELECT count(*) FILTER (WHERE checkpoint_number = {checkpoint_number}),
+                       count(*) FILTER (WHERE checkpoint_number <> {checkpoint_number})
+                FROM testtab
+                """
                 )
-                == 0
-            )
-            assert (
-                query_scalar(
-                    cur,
-                    f"select count(*) from testtab where checkpoint_number={checkpoint_number}",
-                )
-                == table_len
-            )
+                res = cur.fetchone()
+                assert res is not None
+                this_checkpoint_rows, other_checkpoint_rows = res
+                assert other_checkpoint_rows == 0
+                assert this_checkpoint_rows == table_len
 
-        after_downloads = get_num_downloaded_layers(client, tenant_id, timeline_id)
-        num_layers_downloaded.append(after_downloads)
-        log.info(f"num_layers_downloaded[-1]={num_layers_downloaded[-1]}")
+        # the timeline details have all the sizes and counters we need, in a single request
+        detail = client.timeline_detail(tenant_id, timeline_id)
+
+        # current_physical_size reports the total size of all layer files, whether
+        # they are present only in the remote storage, only locally, or both.
+        # It should not change.
+        assert filled_current_physical == detail["current_physical_size"]
+
+        num_layers_downloaded.append(detail["layer_download_count"])
+        log.info(
+            "checkpoint %s: num_layers_downloaded[-1]=%s",
+            checkpoint_number,
+            num_layers_downloaded[-1],
+        )
 
         # Check that on each query, we need to download at least one more layer file. However in
         # practice, thanks to compaction and the fact that some requests need to download
@@ -294,20 +352,95 @@ def test_ondemand_download_timetravel(
         #
         # Do a fuzzy check on that, by checking that after each point-in-time, we have downloaded
         # more files than we had three iterations ago.
-        log.info(f"layers downloaded after checkpoint {checkpoint_number}: {after_downloads}")
-        if len(num_layers_downloaded) > 4:
-            assert after_downloads > num_layers_downloaded[len(num_layers_downloaded) - 4]
+        if len(num_layers_downloaded) == num_layers_downloaded.maxlen:
+            assert num_layers_downloaded[-1] > num_layers_downloaded[0]
 
         # Likewise, assert that the resident_physical_size metric grows as layers are downloaded
-        resident_size.append(get_resident_physical_size())
-        log.info(f"resident_size[-1]={resident_size[-1]}")
-        if len(resident_size) > 4:
-            assert resident_size[-1] > resident_size[len(resident_size) - 4]
+        resident_size.append(detail["current_resident_physical_size"])
+        log.info("resident_size[-1]=%s", resident_size[-1])
+        if len(resident_size) == resident_size.maxlen:
+            assert resident_size[-1] > resident_size[0]
 
-        # current_physical_size reports the total size of all layer files, whether
-        # they are present only in the remote storage, only locally, or both.
-        # It should not change.
-        assert filled_current_physical == get_api_current_physical_size()
+
+#
+# Check the layer_download_count and current_resident_physical_size fields of the
+# timeline details against the metrics they report, before and after on-demand
+# downloads.
+#
+def test_timeline_detail_download_fields(neon_env_builder: NeonEnvBuilder):
+    neon_env_builder.enable_remote_storage(
+        remote_storage_kind=RemoteStorageKind.LOCAL_FS,
+        test_name="test_timeline_detail_download_fields",
+    )
+
+    env = neon_env_builder.init_start()
+    tenant_id = env.initial_tenant
+    timeline_id = env.initial_timeline
+    client = env.pageserver.http_client()
+    downloads_labels = layer_downloads_metric_labels(tenant_id, timeline_id)
+
+    with env.endpoints.create_start("main") as endpoint:
+        endpoint.safe_psql("CREATE TABLE foo AS SELECT x FROM generate_series(1, 10000) g(x)")
+        current_lsn = last_flush_lsn_upload(env, endpoint, tenant_id, timeline_id)
+
+    # Nothing has been downloaded yet: the count is 0, and reading it doesn't
+    # create the download metric.
+    detail = client.timeline_detail(tenant_id, timeline_id)
+    assert detail["layer_download_count"] == 0
+    assert (
+        client.get_metrics().query_exact(
+            "pageserver_remote_operation_seconds_count", downloads_labels
+        )
+        is None
+    )
+    # all the layers are local
+    assert detail["current_resident_physical_size"] == detail["current_physical_size"]
+
+    # Keep the walreceiver from connecting after the restart. That doesn't stop all
+    # background downloads: the first timeline_detail call after the restart spawns
+    # the initial logical size calculation, which downloads layers on its own.
+    for sk in env.safekeepers:
+        sk.stop()
+
+    env.pageserver.stop()
+    unlink_all_layers(env.repo_dir)
+    env.pageserver.start()
+
+    wait_until(10, 0.2, lambda: assert_tenant_state(client, tenant_id, "Active"))
+
+    def detail_matches_metrics() -> Dict[str, Any]:
+        # Background downloads may still be running: retry until the fields match
+        # the metrics and don't change between two consecutive reads.
+        detail = client.timeline_detail(tenant_id, timeline_id)
+        metrics = client.get_metrics()
+        assert detail["layer_download_count"] == get_num_downloaded_layers(
+            metrics, downloads_labels
+        )
+        assert (
+            detail["current_resident_physical_size"]
+            == metrics.query_one(
+                "pageserver_resident_physical_size",
+                {"tenant_id": str(tenant_id), "timeline_id": str(timeline_id)},
+            ).value
+        )
+        detail_again = client.timeline_detail(tenant_id, timeline_id)
+        for field in ["layer_download_count", "current_resident_physical_size"]:
+            assert detail_again[field] == detail[field]
+        return detail
+
+    # The initial size calculation may have downloaded any number of layers, up to all of them
+    detail = wait_until(20, 0.5, detail_matches_metrics)
+    assert detail["current_resident_physical_size"] <= detail["current_physical_size"]
+    downloads_before = detail["layer_download_count"]
+
+    # readonly, so that it doesn't try to connect to the stopped safekeepers
+    with env.endpoints.create_start("main", lsn=current_lsn) as endpoint:
+        assert endpoint.safe_psql("SELECT count(*) FROM foo")[0][0] == 10000
+
+    detail = wait_until(20, 0.5, detail_matches_metrics)
+    assert detail["layer_download_count"] > 0
+    assert detail["layer_download_count"] >= downloads_before
+    assert detail["current_resident_physical_size"] > 0
 
 
 #
@@ -381,9 +514,7 @@ def test_download_remote_layers_api(
 
     # remove all the layer files
     # XXX only delete some of the layer files, to show that it really just downloads all the layers
-    for layer in (Path(env.repo_dir) / "tenants").glob("*/timelines/*/*-*_*"):
-        log.info(f"unlinking layer {layer}")
-        layer.unlink()
+    unlink_all_layers(env.repo_dir)
 
     # Shut down safekeepers before starting the pageserver.
     # If we don't, the tenant's walreceiver handler will trigger the
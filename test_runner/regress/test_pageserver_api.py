@@ -1,13 +1,16 @@
 import subprocess
+import time
 from pathlib import Path
 from typing import Optional
 
+import pytest
 from fixtures.neon_fixtures import (
     DEFAULT_BRANCH_NAME,
     NeonEnv,
     NeonEnvBuilder,
 )
-from fixtures.pageserver.http import PageserverHttpClient
+from fixtures.pageserver.http import PageserverApiException, PageserverHttpClient
+from fixtures.pageserver.utils import wait_for_last_record_lsn
 from fixtures.pg_version import PgVersion
 from fixtures.types import Lsn, TenantId, TimelineId
 from fixtures.utils import wait_until
@@ -190,3 +193,42 @@ def test_pageserver_http_api_client_auth_enabled(neon_env_builder: NeonEnvBuilde
 
     with env.pageserver.http_client(auth_token=pageserver_token) as client:
         check_client(env.pg_version, client, env.initial_tenant)
+
+
+def test_pageserver_http_wait_lsn(neon_simple_env: NeonEnv, monkeypatch: pytest.MonkeyPatch):
+    env = neon_simple_env
+    env.pageserver.allowed_errors.extend(
+        [".*no lsn specified in query parameters.*", ".*cannot parse query param.*"]
+    )
+
+    with env.pageserver.http_client() as client:
+        tenant_id, timeline_id = env.neon_cli.create_tenant()
+        endpoint = env.endpoints.create_start(DEFAULT_BRANCH_NAME, tenant_id=tenant_id)
+        endpoint.safe_psql("CREATE TABLE t(key int primary key, value text)")
+        flush_lsn = Lsn(endpoint.safe_psql("SELECT pg_current_wal_flush_lsn()")[0][0])
+
+        # Returns once the LSN has arrived
+        assert client.timeline_wait_lsn(tenant_id, timeline_id, flush_lsn, timeout=10) >= flush_lsn
+
+        # An LSN that doesn't arrive: still 200, with the last_record_lsn reached so far
+        endpoint.stop()
+        future_lsn = Lsn(flush_lsn.lsn_int + 1024**3)
+        started_at = time.time()
+        last_record_lsn = client.timeline_wait_lsn(tenant_id, timeline_id, future_lsn, timeout=1)
+        assert flush_lsn <= last_record_lsn < future_lsn
+        assert time.time() - started_at < 10, "timeout parameter was not respected"
+
+        # Malformed parameters
+        url = (
+            f"http://localhost:{client.port}/v1/tenant/{tenant_id}/timeline/{timeline_id}/wait_lsn"
+        )
+        for params in [{}, {"lsn": "bogus"}, {"lsn": str(flush_lsn), "timeout": "bogus"}]:
+            res = client.get(url, params=params)
+            assert res.status_code == 400, f"expected 400 for {params}, got {res.status_code}"
+
+        # Pageservers without the endpoint: wait_for_last_record_lsn falls back to polling
+        def wait_lsn_not_found(*args, **kwargs):
+            raise PageserverApiException("not found", status_code=404)
+
+        monkeypatch.setattr(client, "timeline_wait_lsn", wait_lsn_not_found)
+        assert wait_for_last_record_lsn(client, tenant_id, timeline_id, flush_lsn) >= flush_lsn